@@ -1,22 +1,118 @@
+import os
+import time
+import logging
+import threading
 import chromadb
 from chromadb.config import Settings
 
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def _env_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def _clean_meta(m: dict) -> dict:
+    clean = {}
+    for k, v in m.items():
+        if v is None:
+            clean[k] = ""
+        elif isinstance(v, (str, int, float, bool)):
+            clean[k] = v
+        else:
+            clean[k] = str(v)
+    return clean
+
 
 class VectorStore:
-    def __init__(self, dimension: int, collection_name: str = "vector_store"):
+    def __init__(self, dimension: int, collection_name: str = "vector_store",
+                 hnsw_m: int = None, hnsw_construction_ef: int = None, hnsw_search_ef: int = None):
         self.dimension = dimension
         self.collection_name = collection_name
+        # HNSW graph parameters; None keeps Chroma's default. Construction
+        # parameters only take effect when the collection is first created.
+        self.hnsw_m = hnsw_m or _env_int("HNSW_M")
+        self.hnsw_construction_ef = hnsw_construction_ef or _env_int("HNSW_CONSTRUCTION_EF")
+        self.hnsw_search_ef = hnsw_search_ef or _env_int("HNSW_SEARCH_EF")
         self.texts = []
         self.meta = []
         self._client = None
         self._collection = None
+        # Bumped whenever the indexed contents may have changed, so caches
+        # keyed on it are invalidated.
+        self.version = 0
+
+    def _hnsw_metadata(self) -> dict:
+        metadata = {"hnsw:space": "l2"}
+        if self.hnsw_m:
+            metadata["hnsw:M"] = self.hnsw_m
+        if self.hnsw_construction_ef:
+            metadata["hnsw:construction_ef"] = self.hnsw_construction_ef
+        if self.hnsw_search_ef:
+            metadata["hnsw:search_ef"] = self.hnsw_search_ef
+        return metadata
 
     def _init_collection(self, folder: str):
         self._client = chromadb.PersistentClient(path=folder)
         self._collection = self._client.get_or_create_collection(
             name=self.collection_name,
-            metadata={"hnsw:space": "l2"},
+            metadata=self._hnsw_metadata(),
         )
+        self._apply_hnsw_settings()
+
+    def _current_hnsw(self) -> dict:
+        # Newer Chroma keeps live HNSW settings in the collection configuration;
+        # older releases only have the creation metadata.
+        metadata = self._collection.metadata or {}
+        current = {key: metadata.get(key) for key in ("hnsw:M", "hnsw:construction_ef", "hnsw:search_ef")}
+        config = getattr(self._collection, "configuration_json", None) or {}
+        hnsw = config.get("hnsw") or {}
+        if hnsw:
+            current["hnsw:M"] = hnsw.get("max_neighbors", current["hnsw:M"])
+            current["hnsw:construction_ef"] = hnsw.get("ef_construction", current["hnsw:construction_ef"])
+            current["hnsw:search_ef"] = hnsw.get("ef_search", current["hnsw:search_ef"])
+        return current
+
+    def _apply_hnsw_settings(self):
+        """Reconcile requested HNSW settings with an existing collection.
+
+        get_or_create_collection only applies metadata on create. ef_search is
+        a query-time setting and is updated in place; M and ef_construction
+        are fixed once the graph is built.
+        """
+        wanted = self._hnsw_metadata()
+        current = self._current_hnsw()
+
+        for key in ("hnsw:M", "hnsw:construction_ef"):
+            if key in wanted and current.get(key) != wanted[key]:
+                logger.warning(
+                    "[VectorStore] %s=%s requested but collection '%s' was built with %s; "
+                    "rebuild the store to apply it.",
+                    key, wanted[key], self.collection_name, current.get(key),
+                )
+
+        ef_search = wanted.get("hnsw:search_ef")
+        if ef_search is None or current.get("hnsw:search_ef") == ef_search:
+            return
+        try:
+            try:
+                self._collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+            except TypeError:
+                # Releases without collection configuration take it via metadata.
+                metadata = dict(self._collection.metadata or {})
+                metadata["hnsw:search_ef"] = ef_search
+                self._collection.modify(metadata=metadata)
+            logger.info("[VectorStore] Set hnsw:search_ef=%d on '%s'.", ef_search, self.collection_name)
+        except Exception as e:
+            logger.warning("[VectorStore] Could not update hnsw:search_ef on '%s': %s", self.collection_name, e)
+
+    def _max_add(self) -> int:
+        try:
+            return self._client.get_max_batch_size()
+        except Exception:
+            return 5000
 
     def add_vectors(self, vectors, metadata_list):
         if not vectors or self._collection is None:
@@ -25,28 +121,21 @@ class VectorStore:
         ids = [str(len(self.texts) + i) for i in range(len(vectors))]
         embeddings = [v if isinstance(v, list) else v.tolist() for v in vectors]
         documents = [m["text"] for m in metadata_list]
-        metadatas = []
-        for m in metadata_list:
-            clean = {}
-            for k, v in m.items():
-                if v is None:
-                    clean[k] = ""
-                elif isinstance(v, (str, int, float, bool)):
-                    clean[k] = v
-                else:
-                    clean[k] = str(v)
-            metadatas.append(clean)
-
-        self._collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-        )
+        metadatas = [_clean_meta(m) for m in metadata_list]
+
+        step = self._max_add()
+        for i in range(0, len(ids), step):
+            self._collection.add(
+                ids=ids[i:i + step],
+                embeddings=embeddings[i:i + step],
+                documents=documents[i:i + step],
+                metadatas=metadatas[i:i + step],
+            )
 
         for m in metadata_list:
             self.texts.append(m["text"])
             self.meta.append(m)
+        self.version += 1
 
     def save(self, folder: str = "chroma_store"):
         # ChromaDB PersistentClient auto-saves — no manual step needed.
@@ -59,6 +148,12 @@ class VectorStore:
         results = self._collection.get(include=["documents", "metadatas"])
         self.texts = results.get("documents") or []
         self.meta = results.get("metadatas") or []
+        self.version += 1
+
+    def count(self) -> int:
+        if self._collection is None:
+            return 0
+        return self._collection.count()
 
     def search(self, query_emb, k: int = 5):
         if self._collection is None:
@@ -89,3 +184,89 @@ class VectorStore:
             })
 
         return out
+
+
+class BulkWriter:
+    """Write-behind buffer in front of `VectorStore.add_vectors`.
+
+    Vectors are collected and written as one bulk add once `max_rows` are
+    buffered (in the caller's thread) or `max_delay` seconds after the oldest
+    buffered row (in a background thread). `on_flush(metadata_list)` is
+    called after each successful write. Use as a context manager, or call
+    `close()`, to write whatever is left.
+    """
+
+    def __init__(self, store: VectorStore, max_rows: int = None, max_delay: float = None, on_flush=None):
+        self.store = store
+        self.max_rows = max(1, max_rows or int(os.getenv("BULK_WRITE_ROWS", "1000")))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("BULK_WRITE_DELAY", "2.0"))
+        self.on_flush = on_flush
+        self._vectors = []
+        self._meta = []
+        self._oldest = None
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="chroma-bulk-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, vectors, metadata_list):
+        if self._error is not None:
+            raise self._error
+        with self._cond:
+            self._vectors.extend(vectors)
+            self._meta.extend(metadata_list)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._cond.notify()
+            full = len(self._vectors) >= self.max_rows
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            with self._cond:
+                vectors, meta = self._vectors, self._meta
+                self._vectors, self._meta, self._oldest = [], [], None
+            if not vectors:
+                return
+            t0 = time.time()
+            self.store.add_vectors(vectors, meta)
+            logger.info("[BulkWriter] Wrote %d vectors in %.2fs", len(vectors), time.time() - t0)
+            if self.on_flush:
+                self.on_flush(meta)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                if self._oldest is None:
+                    self._cond.wait()
+                    continue
+                wait = self._oldest + self.max_delay - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("[BulkWriter] Background flush failed: %s", e)
+                self._error = e
+                return
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,132 @@
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Callable, Hashable, List
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class SingleFlight:
+    """Share one upstream call between concurrent callers asking for the same key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable):
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            return fut.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared}
+
+
+class _Window:
+    __slots__ = ("items", "futures", "full")
+
+    def __init__(self):
+        self.items = []
+        self.futures = []
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """Collect items submitted within `window` seconds into one `fn(items)` call.
+
+    The first caller of a window waits for it to close (or fill up to
+    `max_batch`), then runs the batch on behalf of everyone in it. If the
+    batch call fails, each item is retried alone with `single_fn` so one bad
+    item only fails its own callers.
+    """
+
+    def __init__(self, fn: Callable[[List], List], window: float = 0.005, max_batch: int = 16,
+                 single_fn: Callable = None):
+        self.fn = fn
+        self.single_fn = single_fn or (lambda item: fn([item])[0])
+        self.window = max(0.0, window)
+        self.max_batch = max(1, max_batch)
+        self._lock = threading.Lock()
+        self._current = None
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item):
+        fut = Future()
+        with self._lock:
+            win = self._current
+            leader = win is None
+            if leader:
+                win = self._current = _Window()
+            win.items.append(item)
+            win.futures.append(fut)
+            if len(win.items) >= self.max_batch:
+                self._current = None
+                win.full.set()
+
+        if leader:
+            win.full.wait(self.window)
+            with self._lock:
+                if self._current is win:
+                    self._current = None
+            self._dispatch(win)
+
+        return fut.result()
+
+    def _dispatch(self, win: _Window):
+        with self._lock:
+            self.batches += 1
+            self.items += len(win.items)
+        if len(win.items) > 1:
+            logger.info("[Coalesce] Dispatching batch of %d", len(win.items))
+        try:
+            results = self.fn(win.items)
+            if len(results) != len(win.items):
+                raise ValueError(f"Batch returned {len(results)} results for {len(win.items)} items")
+        except Exception as e:
+            if len(win.items) == 1:
+                win.futures[0].set_exception(e)
+                return
+            logger.warning("[Coalesce] Batch of %d failed (%s); retrying items one by one",
+                           len(win.items), str(e)[:200])
+            for item, fut in zip(win.items, win.futures):
+                try:
+                    fut.set_result(self.single_fn(item))
+                except Exception as e2:
+                    fut.set_exception(e2)
+            return
+        except BaseException as e:
+            for fut in win.futures:
+                fut.set_exception(e)
+            raise
+        for fut, res in zip(win.futures, results):
+            fut.set_result(res)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"batches": self.batches, "items": self.items}
@@ -109,6 +109,13 @@ class EmbeddingGenerator:
         data = self._request_with_failover(text.strip(), "single")
         return data["data"][0]["embedding"]
 
+    def generate_embeddings_once(self, texts):
+        """Embed `texts` in one request, without adaptive batch shrinking."""
+        if not texts:
+            return []
+        data = self._request_with_failover([t.strip() for t in texts], f"batch[{len(texts)}]")
+        return [item["embedding"] for item in data["data"]]
+
     def generate_embeddings_batch(self, texts):
         if not texts:
             return []
@@ -0,0 +1,154 @@
+"""Recall/latency benchmark for VectorStore HNSW settings.
+
+Builds one throwaway store per (M, ef_construction) pair, queries it at
+every requested ef_search, and reports build time, recall@k against exact
+(brute-force) L2 neighbours, and query latency percentiles.
+
+    python hnsw_bench.py --db chroma_store --m 16 32 --ef-construction 100 200 --ef-search 10 50 100
+"""
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import itertools
+
+import numpy as np
+
+from vector_store import VectorStore
+
+
+def load_vectors(db: str, limit: int):
+    store = VectorStore(1536)
+    store.load(db)
+    got = store._collection.get(include=["embeddings"], limit=limit)
+    embeddings = got.get("embeddings")
+    if embeddings is None or len(embeddings) == 0:
+        raise SystemExit(f"No vectors found in {db}.")
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, size=n)] + 0.5 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def make_queries(vectors, n: int, noise: float, seed: int):
+    rng = np.random.default_rng(seed + 1)
+    picks = vectors[rng.integers(0, len(vectors), size=n)]
+    return (picks + noise * rng.normal(size=picks.shape)).astype(np.float32)
+
+
+def exact_neighbours(vectors, queries, k: int):
+    # ||q - v||^2 = ||q||^2 - 2 q.v + ||v||^2; ||q||^2 is constant per row.
+    d = (vectors * vectors).sum(axis=1)[None, :] - 2.0 * queries @ vectors.T
+    return [set(row) for row in np.argsort(d, axis=1)[:, :k]]
+
+
+def build_store(vectors, m, ef_c, batch, folder):
+    store = VectorStore(vectors.shape[1], hnsw_m=m, hnsw_construction_ef=ef_c)
+    store.load(folder)
+
+    t0 = time.perf_counter()
+    for start in range(0, len(vectors), batch):
+        rows = range(start, min(start + batch, len(vectors)))
+        store.add_vectors([vectors[i].tolist() for i in rows],
+                          [{"text": f"row {i}", "row": i} for i in rows])
+    return store, time.perf_counter() - t0
+
+
+def run_queries(store, queries, truth, k):
+    latencies = []
+    recall = 0.0
+    for q, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        hits = store.search(q.tolist(), k=k)
+        latencies.append(time.perf_counter() - t0)
+        recall += len({h["meta"]["row"] for h in hits} & expected) / k
+
+    latencies.sort()
+    return {
+        "recall": recall / len(queries),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def reopen_store(folder, dim, ef_s):
+    # Chroma keeps an opened HNSW index cached per path for the life of the
+    # process, so an ef_search change only reaches queries once it is reloaded.
+    try:
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+    except ImportError:
+        pass
+    store = VectorStore(dim, hnsw_search_ef=ef_s)
+    store.load(folder)
+    return store
+
+
+def run_config(vectors, queries, truth, k, m, ef_c, ef_search_values, batch):
+    """Build one graph for (M, ef_construction) and query it at each ef_search.
+
+    ef_search is a query-time setting, so every value is measured on the same
+    graph; rebuilding per value would mix build noise into the comparison.
+    """
+    folder = tempfile.mkdtemp(prefix="hnsw_bench_")
+    try:
+        store, build_s = build_store(vectors, m, ef_c, batch, folder)
+        results = []
+        for ef_s in ef_search_values:
+            store.hnsw_search_ef = ef_s
+            store._apply_hnsw_settings()
+            store = reopen_store(folder, vectors.shape[1], ef_s)
+            results.append({
+                "M": m,
+                "ef_construction": ef_c,
+                "ef_search": ef_s,
+                "build_s": build_s,
+                **run_queries(store, queries, truth, k),
+            })
+        return results
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark HNSW M / ef_construction / ef_search for our corpus.")
+    p.add_argument("--db", default=None, help="Take vectors from this Chroma store (default: synthetic).")
+    p.add_argument("--limit", type=int, default=20000, help="Max vectors to read from --db.")
+    p.add_argument("--n", type=int, default=10000, help="Synthetic corpus size.")
+    p.add_argument("--dim", type=int, default=1536, help="Synthetic vector dimension.")
+    p.add_argument("--clusters", type=int, default=50, help="Synthetic topic clusters.")
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--noise", type=float, default=0.05, help="Noise added to sampled query vectors.")
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--m", type=int, nargs="+", default=[16])
+    p.add_argument("--ef-construction", type=int, nargs="+", default=[100])
+    p.add_argument("--ef-search", type=int, nargs="+", default=[10, 50, 100])
+    p.add_argument("--batch", type=int, default=1000, help="Rows per add_vectors call while building.")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    logging.disable(logging.INFO)
+
+    if args.db:
+        vectors = load_vectors(args.db, args.limit)
+    else:
+        vectors = synthetic_vectors(args.n, args.dim, args.clusters, args.seed)
+    queries = make_queries(vectors, args.queries, args.noise, args.seed)
+    truth = exact_neighbours(vectors, queries, args.k)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    print(f"{'M':>4} {'ef_c':>6} {'ef_s':>6} {'build_s':>9} {'recall':>8} {'p50_ms':>8} {'p99_ms':>8}")
+    for m, ef_c in itertools.product(args.m, args.ef_construction):
+        for r in run_config(vectors, queries, truth, args.k, m, ef_c, args.ef_search, args.batch):
+            print(f"{r['M']:>4} {r['ef_construction']:>6} {r['ef_search']:>6} {r['build_s']:>9.2f} "
+                  f"{r['recall']:>8.3f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
-import os, logging
+import os, json, time, logging, argparse, threading, multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from tqdm import tqdm
-from vector_store import VectorStore
+from vector_store import VectorStore, BulkWriter
 from embedding_generator import EmbeddingGenerator
 from tabular_processor import process_csv_file, process_xlsx_file
 from pdf_processor import process_single_pdf
@@ -10,6 +12,8 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 CHROMA_STORE = "chroma_store"
+SUPPORTED_EXTS = (".pdf", ".csv", ".xlsx", ".txt")
+CHECKPOINT_FILE = "ingest_checkpoint.json"
 
 
 def _preflight():
@@ -21,25 +25,29 @@ def _preflight():
         raise RuntimeError(f"Embedding preflight failed: {e}")
 
 
-def index_single_file(path: str, db: str = CHROMA_STORE, batch: int = 17):
-    _preflight()
-
-    if not os.path.isfile(path):
-        raise FileNotFoundError(path)
-
+def _load_chunks(path: str, chunk_size: int = 900, overlap: int = 120, pdf_mode: str = None):
     ext = os.path.splitext(path)[1].lower()
-    filename = os.path.basename(path)
 
     if ext == ".pdf":
-        chunks = process_single_pdf(path)
+        return process_single_pdf(path, chunk_size=chunk_size, overlap=overlap, mode=pdf_mode)
     elif ext == ".csv":
-        chunks = process_csv_file(path)
+        return process_csv_file(path)
     elif ext == ".xlsx":
-        chunks = process_xlsx_file(path)
+        return process_xlsx_file(path)
     elif ext == ".txt":
-        chunks = process_text_file(path)
-    else:
-        raise ValueError("Unsupported format.")
+        return process_text_file(path, chunk_size=chunk_size, overlap=overlap)
+    raise ValueError("Unsupported format.")
+
+
+def index_single_file(path: str, db: str = CHROMA_STORE, batch: int = 17,
+                      chunk_size: int = 900, overlap: int = 120, pdf_mode: str = None):
+    _preflight()
+
+    if not os.path.isfile(path):
+        raise FileNotFoundError(path)
+
+    filename = os.path.basename(path)
+    chunks = _load_chunks(path, chunk_size=chunk_size, overlap=overlap, pdf_mode=pdf_mode)
 
     logger.info(f"{filename}: {len(chunks)} chunks to embed.")
     if not chunks:
@@ -58,13 +66,225 @@ def index_single_file(path: str, db: str = CHROMA_STORE, batch: int = 17):
     total = len(chunks)
     added = 0
 
-    for start in tqdm(range(0, total, batch), desc="Embedding"):
-        end = min(start + batch, total)
-        batch_chunks = chunks[start:end]
-        texts = [c["text"] for c in batch_chunks]
-        vecs = eg.generate_embeddings_batch(texts)
-        store.add_vectors(vecs, batch_chunks)
-        added += len(vecs)
+    with BulkWriter(store) as writer:
+        for start in tqdm(range(0, total, batch), desc="Embedding"):
+            end = min(start + batch, total)
+            batch_chunks = chunks[start:end]
+            texts = [c["text"] for c in batch_chunks]
+            vecs = eg.generate_embeddings_batch(texts)
+            writer.add(vecs, batch_chunks)
+            added += len(vecs)
 
     store.save(db)
     logger.info(f"Indexed {added} vectors from {filename}.")
+
+
+def _file_signature(path: str):
+    st = os.stat(path)
+    return [st.st_size, int(st.st_mtime)]
+
+
+def _load_checkpoint(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {"done": {}, "partial": {}}
+    state.setdefault("done", {})
+    state.setdefault("partial", {})
+    return state
+
+
+def _save_checkpoint(path: str, state: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _extract_job(path: str, chunk_size: int, overlap: int, pdf_mode: str):
+    # Signature is taken before reading, so an edit during extraction makes
+    # the recorded signature stale and the file is re-indexed next run.
+    sig = _file_signature(path)
+    return path, sig, _load_chunks(path, chunk_size=chunk_size, overlap=overlap, pdf_mode=pdf_mode)
+
+
+def index_directory(root: str, db: str = CHROMA_STORE, batch: int = 17,
+                    workers: int = None, checkpoint: str = None,
+                    chunk_size: int = 900, overlap: int = 120, pdf_mode: str = None) -> dict:
+    """Index every supported file under `root` into one store.
+
+    Files are extracted in a process pool and their chunks packed into full
+    embedding batches across file boundaries. Vectors go through one
+    BulkWriter; progress is checkpointed after every bulk write, so an
+    interrupted run resumes without re-embedding anything already stored.
+    """
+    if not os.path.isdir(root):
+        raise NotADirectoryError(root)
+
+    _preflight()
+
+    os.makedirs(db, exist_ok=True)
+    checkpoint = checkpoint or os.path.join(db, CHECKPOINT_FILE)
+    state = _load_checkpoint(checkpoint)
+
+    # Resume offsets count chunks, so they only hold for the same chunking.
+    chunking = {"chunk_size": chunk_size, "overlap": overlap, "pdf_mode": pdf_mode}
+    if state.setdefault("chunking", chunking) != chunking:
+        raise ValueError(
+            f"Checkpoint {checkpoint} was written with chunking {state['chunking']}; "
+            f"use a new --db or --checkpoint to index with {chunking}."
+        )
+
+    paths = []
+    skipped = 0
+    for dirpath, _, names in os.walk(root):
+        for name in sorted(names):
+            if not name.lower().endswith(SUPPORTED_EXTS):
+                continue
+            path = os.path.abspath(os.path.join(dirpath, name))
+            if state["done"].get(path) == _file_signature(path):
+                skipped += 1
+            else:
+                paths.append(path)
+    paths.sort()
+    logger.info(f"Bulk ingest: {len(paths)} files to index, {skipped} already done.")
+
+    eg = EmbeddingGenerator()
+    store = VectorStore(1536)
+    try:
+        store.load(db)
+        logger.info("Loaded existing Chroma store.")
+    except Exception:
+        logger.info("No existing Chroma store; creating new.")
+
+    pending = []    # (path, chunk) waiting for an embedding batch
+    unwritten = deque()  # path of each row handed to the writer, in order
+    remaining = {}  # path -> [chunks of that file not yet written, signature at extraction]
+    stats = {"files": 0, "chunks": 0, "failed": 0, "skipped": skipped}
+    lock = threading.Lock()
+    t0 = time.time()
+    bar = tqdm(desc="Embedding", unit="chunk")
+
+    def on_written(meta):
+        # Runs after each bulk write, possibly on the writer's thread.
+        with lock:
+            for _ in meta:
+                path = unwritten.popleft()
+                left = remaining[path]
+                entry = state["partial"].get(path)
+                if entry is None:
+                    entry = state["partial"][path] = {"sig": left[1], "written": 0}
+                entry["written"] += 1
+                left[0] -= 1
+                if left[0] == 0:
+                    state["done"][path] = state["partial"].pop(path)["sig"]
+                    del remaining[path]
+                    stats["files"] += 1
+            stats["chunks"] += len(meta)
+            _save_checkpoint(checkpoint, state)
+
+    writer = BulkWriter(store, on_flush=on_written)
+
+    def embed(n):
+        take, pending[:] = pending[:n], pending[n:]
+        items = [c for _, c in take]
+        vecs = eg.generate_embeddings_batch([c["text"] for c in items])
+        with lock:
+            unwritten.extend(path for path, _ in take)
+        writer.add(vecs, items)
+        bar.update(len(items))
+
+    def accept(path, sig, chunks):
+        if not chunks:
+            # Extractors log and return [] on errors, so an empty result may be
+            # transient; leave it out of the checkpoint so a resume retries it.
+            logger.warning(f"{os.path.basename(path)}: no chunks extracted; not checkpointed.")
+            with lock:
+                stats["failed"] += 1
+            return
+
+        with lock:
+            partial = state["partial"].get(path)
+            if partial and partial["sig"] != sig:
+                logger.warning(f"{os.path.basename(path)} changed since the last run; re-indexing from start.")
+                partial = None
+                state["partial"].pop(path, None)
+            already = partial["written"] if partial else 0
+            todo = chunks[already:]
+            if not todo:
+                state["done"][path] = sig
+                state["partial"].pop(path, None)
+                stats["files"] += 1
+                _save_checkpoint(checkpoint, state)
+                return
+            remaining[path] = [len(todo), sig]
+        pending.extend((path, c) for c in todo)
+        while len(pending) >= batch:
+            embed(batch)
+
+    workers = workers or os.cpu_count() or 1
+    # Spawn rather than fork: the writer thread, tqdm and the Chroma client are
+    # already running, and forking while they hold locks can deadlock children.
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    with writer, pool:
+        queue = iter(paths)
+        running = set()
+        while True:
+            # Keep a bounded number of extractions ahead of the embedder.
+            while len(running) < workers * 2:
+                path = next(queue, None)
+                if path is None:
+                    break
+                running.add(pool.submit(_extract_job, path, chunk_size, overlap, pdf_mode))
+            if not running:
+                break
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                try:
+                    path, sig, chunks = fut.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.error(f"Extraction failed: {e}")
+                    continue
+                accept(path, sig, chunks)
+
+        while pending:
+            embed(batch)
+
+    bar.close()
+    store.save(db)
+
+    elapsed = max(time.time() - t0, 1e-9)
+    stats["elapsed_s"] = round(elapsed, 2)
+    stats["files_per_s"] = round(stats["files"] / elapsed, 2)
+    stats["chunks_per_s"] = round(stats["chunks"] / elapsed, 2)
+    logger.info(
+        f"Bulk ingest: {stats['files']} files, {stats['chunks']} chunks in {stats['elapsed_s']}s "
+        f"({stats['files_per_s']} files/s, {stats['chunks_per_s']} chunks/s); "
+        f"{stats['skipped']} skipped, {stats['failed']} failed."
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Index a file, or bulk-ingest a directory, into the Chroma store.")
+    parser.add_argument("path", help="File or directory to index.")
+    parser.add_argument("--db", default=CHROMA_STORE)
+    parser.add_argument("--batch", type=int, default=17, help="Chunks per embedding request.")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel extraction processes.")
+    parser.add_argument("--checkpoint", default=None,
+                        help=f"Checkpoint file (default: <db>/{CHECKPOINT_FILE}).")
+    parser.add_argument("--chunk-size", type=int, default=900, help="Characters per chunk (PDF/TXT).")
+    parser.add_argument("--overlap", type=int, default=120, help="Characters shared by adjacent chunks (PDF/TXT).")
+    parser.add_argument("--pdf-mode", choices=["layout", "fast"], default=None,
+                        help="PDF extraction mode (default: PDF_EXTRACT_MODE or layout).")
+    args = parser.parse_args()
+
+    chunking = {"chunk_size": args.chunk_size, "overlap": args.overlap, "pdf_mode": args.pdf_mode}
+    if os.path.isdir(args.path):
+        index_directory(args.path, db=args.db, batch=args.batch, workers=args.workers,
+                        checkpoint=args.checkpoint, **chunking)
+    else:
+        index_single_file(args.path, db=args.db, batch=args.batch, **chunking)
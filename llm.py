@@ -1,6 +1,7 @@
 import os
 import requests
 from dotenv import load_dotenv
+from coalesce import SingleFlight
 
 load_dotenv()
 
@@ -14,10 +15,16 @@ class LLMInterface:
         if not self.api_key or not self.llm_url:
             raise ValueError("Missing API_KEY or LLM_URL in environment.")
 
+        self._inflight = SingleFlight()
+
     def generate_response(self, query, context, refusal=False):
         if refusal:
             return "I can only answer questions about the uploaded documents."
 
+        # Identical concurrent questions over the same context share one LLM call.
+        return self._inflight.do((query, context), lambda: self._generate(query, context))
+
+    def _generate(self, query, context):
         is_summary = any(kw in query.lower() for kw in
                          {"summarize", "summary", "overview", "summarise", "what is in", "what's in"})
 
@@ -0,0 +1,498 @@
+"""End-to-end load test for the FastAPI app in main.py.
+
+Runs the app under uvicorn in a child process against stand-in embedding/LLM
+servers (a second child process) with injected latency, drives mixed /chat, summary /chat and /upload traffic, and
+reports throughput, latency percentiles, error rates and event-loop lag.
+
+    python loadtest.py --duration 30 --concurrency 32 --rate 50 --upload-ratio 0.05
+
+main.py imports its siblings by module name (retriever, vector_store, ...)
+while some files on disk use short names (re.py, chro.py, ...). The app
+process maps those names to the files in _MODULE_FILES; any module that is
+neither on disk nor mapped (e.g. tabular_processor) must be importable from
+the environment, otherwise startup fails with a message naming it.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import hashlib
+import logging
+import argparse
+import shutil
+import tempfile
+import importlib.abc
+import importlib.util
+import threading
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Import name used by main.py and friends -> file in this directory.
+_MODULE_FILES = {
+    "retriever": "re.py",
+    "vector_store": "chro.py",
+    "embedding_generator": "emb_gen.py",
+    "llm_interface": "llm.py",
+    "indexer": "index.py",
+    "pdf_processor": "pdf.py",
+    "text_processor": "text.py",
+}
+DIMENSION = 1536
+
+WORDS = (
+    "policy leave benefits payroll onboarding security laptop travel expense "
+    "holiday remote office training manager approval deadline contract invoice "
+    "vendor support network password access badge parking insurance pension"
+).split()
+
+QUESTIONS = [
+    "What is the leave policy?",
+    "How do I request a new laptop?",
+    "Who approves travel expenses?",
+    "When is the invoice deadline for vendors?",
+    "How do I reset my network password?",
+    "What does the pension plan cover?",
+    "How many remote days are allowed per week?",
+    "Where do I pick up my office badge?",
+]
+
+SUMMARY_QUESTIONS = [
+    "Summarize the uploaded documents",
+    "Give me an overview of the policies",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, int(round(p / 100.0 * (len(values) - 1)))))
+    return values[idx]
+
+
+def _summarize(values, scale=1000.0):
+    return {
+        "p50_ms": round(_percentile(values, 50) * scale, 2),
+        "p90_ms": round(_percentile(values, 90) * scale, 2),
+        "p99_ms": round(_percentile(values, 99) * scale, 2),
+        "max_ms": round(max(values) * scale, 2) if values else 0.0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Stand-in upstream servers (own process)
+# ---------------------------------------------------------------------------
+
+class _StubState:
+    def __init__(self, embed_latency, llm_latency, jitter):
+        self.embed_latency = embed_latency
+        self.llm_latency = llm_latency
+        self.jitter = jitter
+        self.calls = defaultdict(int)
+        self.items = defaultdict(int)
+        self.lock = threading.Lock()
+        self.vectors = {}
+        rng = random.Random(0)
+        self.common = [rng.gauss(0, 1) for _ in range(DIMENSION)]
+
+    def sleep(self, base):
+        time.sleep(max(0.0, base + random.uniform(-self.jitter, self.jitter)))
+
+    def embedding_json(self, text: str) -> str:
+        # One JSON-encoded vector per distinct text, computed once. A shared
+        # component keeps documents and questions within the retriever's
+        # distance threshold, so chats go all the way through to the LLM.
+        key = hashlib.md5(text.encode("utf-8")).digest()
+        raw = self.vectors.get(key)
+        if raw is None:
+            rng = random.Random(key)
+            vec = [0.8 * c + 0.6 * rng.gauss(0, 1) for c in self.common]
+            norm = sum(v * v for v in vec) ** 0.5
+            raw = self.vectors[key] = json.dumps([v / norm for v in vec])
+        return raw
+
+
+def _make_handler(state: _StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, raw: str):
+            body = raw.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with state.lock:
+                self._reply(json.dumps({"calls": dict(state.calls), "items": dict(state.items)}))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path.startswith("/embeddings"):
+                inp = payload.get("input")
+                texts = inp if isinstance(inp, list) else [inp]
+                with state.lock:
+                    state.calls["embeddings"] += 1
+                    state.items["embeddings"] += len(texts)
+                state.sleep(state.embed_latency)
+                items = ",".join(f'{{"index": {i}, "embedding": {state.embedding_json(t)}}}'
+                                 for i, t in enumerate(texts))
+                self._reply(f'{{"data": [{items}]}}')
+            else:
+                with state.lock:
+                    state.calls["llm"] += 1
+                state.sleep(state.llm_latency)
+                self._reply(json.dumps(
+                    {"choices": [{"message": {"content": "Stub answer.\nSources: loadtest.txt"}}]}))
+
+    return Handler
+
+
+def _serve_stubs(port, embed_latency, llm_latency, jitter):
+    state = _StubState(embed_latency, llm_latency, jitter)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(state))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def stub_stats(stub_url) -> dict:
+    return requests.get(f"{stub_url}/stats", timeout=10).json()
+
+
+# ---------------------------------------------------------------------------
+# App under test (own process)
+# ---------------------------------------------------------------------------
+
+_lag_samples = []
+
+
+async def _monitor_lag(interval):
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        _lag_samples.append(max(0.0, time.perf_counter() - t0 - interval))
+
+
+async def _lag_report(reset: bool = False):
+    samples = list(_lag_samples)
+    if reset:
+        _lag_samples.clear()
+    return {"samples": len(samples), **_summarize(samples)}
+
+
+class _AliasFinder(importlib.abc.MetaPathFinder):
+    """Resolve main.py's import names to the short file names on disk.
+
+    Sits after the normal finders, so a real module of the same name wins.
+    """
+
+    def find_spec(self, name, path, target=None):
+        filename = _MODULE_FILES.get(name)
+        if path is not None or filename is None:
+            return None
+        location = os.path.join(REPO_DIR, filename)
+        if not os.path.exists(location):
+            return None
+        return importlib.util.spec_from_file_location(name, location)
+
+
+def _serve_app(port, workdir, env, lag_interval):
+    os.environ.update(env)
+    os.chdir(workdir)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    sys.meta_path.append(_AliasFinder())
+
+    import uvicorn
+    try:
+        import main
+    except ModuleNotFoundError as e:
+        raise SystemExit(f"Cannot import main.py: module '{e.name}' not found (see loadtest.py docstring).")
+
+    logging.disable(logging.INFO)
+    main.app.add_api_route("/_loadtest/lag", _lag_report, methods=["GET"])
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+
+    async def run():
+        # The sampler shares the app's event loop, so any handler that blocks
+        # the loop shows up as lag here.
+        monitor = asyncio.get_running_loop().create_task(_monitor_lag(lag_interval))
+        try:
+            await server.serve()
+        finally:
+            monitor.cancel()
+
+    asyncio.run(run())
+
+
+def _wait_ready(url, proc, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not proc.is_alive():
+            raise RuntimeError(f"{url} exited during startup (code {proc.exitcode}).")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not start within {timeout:.0f}s.")
+
+
+def start_processes(args, workdir):
+    ctx = multiprocessing.get_context("spawn")
+
+    stub_port = _free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    stubs = ctx.Process(
+        target=_serve_stubs,
+        args=(stub_port, args.embed_latency_ms / 1000.0, args.llm_latency_ms / 1000.0, args.jitter_ms / 1000.0),
+        daemon=True,
+    )
+    stubs.start()
+    _wait_ready(f"{stub_url}/stats", stubs)
+
+    env = {
+        "API_KEY": "loadtest",
+        "EMBEDDING_MODEL_URL": f"{stub_url}/embeddings",
+        "LLM_URL": f"{stub_url}/chat/completions",
+        "EMBEDDING_FALLBACK_URL": "",
+        "EMBEDDING_FALLBACK_MODEL": "",
+        "TQDM_DISABLE": "1",
+    }
+    app_port = _free_port()
+    base_url = f"http://127.0.0.1:{app_port}"
+    app = ctx.Process(target=_serve_app, args=(app_port, workdir, env, args.lag_interval_ms / 1000.0), daemon=True)
+    app.start()
+    _wait_ready(f"{base_url}/_loadtest/lag", app)
+
+    return stubs, stub_url, app, base_url
+
+
+# ---------------------------------------------------------------------------
+# Traffic
+# ---------------------------------------------------------------------------
+
+class LoadDriver:
+    def __init__(self, base_url, args):
+        self.base_url = base_url
+        self.args = args
+        self.results = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._uploads = 0
+
+    def _session(self):
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = self._local.session = requests.Session()
+        return s
+
+    def _pick(self):
+        r = random.random()
+        if r < self.args.upload_ratio:
+            return "upload"
+        if r < self.args.upload_ratio + self.args.summary_ratio:
+            return "summary"
+        return "chat"
+
+    def _document(self, words=400):
+        return " ".join(random.choice(WORDS) for _ in range(words))
+
+    def upload(self, name=None):
+        with self.lock:
+            self._uploads += 1
+            n = self._uploads
+        name = name or f"loadtest_{os.getpid()}_{n}.txt"
+        files = {"file": (name, self._document().encode("utf-8"), "text/plain")}
+        return self._session().post(f"{self.base_url}/upload", files=files, timeout=self.args.timeout)
+
+    def chat(self, text):
+        return self._session().post(f"{self.base_url}/chat", json={"text": text}, timeout=self.args.timeout)
+
+    def one(self, scheduled=None):
+        kind = self._pick()
+        start = scheduled if scheduled is not None else time.perf_counter()
+        ok = False
+        try:
+            if kind == "upload":
+                res = self.upload()
+            elif kind == "summary":
+                res = self.chat(random.choice(SUMMARY_QUESTIONS))
+            else:
+                res = self.chat(random.choice(QUESTIONS))
+            ok = res.status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.results[kind].append(elapsed)
+            if not ok:
+                self.errors[kind] += 1
+
+    def run_closed(self, deadline):
+        def worker():
+            while time.perf_counter() < deadline:
+                self.one()
+
+        with ThreadPoolExecutor(self.args.concurrency) as pool:
+            for _ in range(self.args.concurrency):
+                pool.submit(worker)
+
+    def run_open(self, deadline):
+        # Latency is measured from the scheduled arrival time, so time spent
+        # waiting for a free client slot shows up as queueing delay.
+        with ThreadPoolExecutor(self.args.concurrency) as pool:
+            next_at = time.perf_counter()
+            while next_at < deadline:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.one, next_at)
+                next_at += random.expovariate(self.args.rate)
+
+
+def build_report(driver, upstream, lag, elapsed, cache_stats):
+    kinds = {}
+    total = errors = 0
+    for kind, lat in sorted(driver.results.items()):
+        total += len(lat)
+        errors += driver.errors[kind]
+        kinds[kind] = {
+            "requests": len(lat),
+            "errors": driver.errors[kind],
+            "error_rate": round(driver.errors[kind] / len(lat), 4) if lat else 0.0,
+            "throughput_rps": round(len(lat) / elapsed, 2),
+            **_summarize(lat),
+        }
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / elapsed, 2),
+        "by_kind": kinds,
+        "event_loop_lag": lag,
+        "upstream": upstream,
+        "cache": cache_stats,
+    }
+
+
+def print_report(report):
+    print(f"\nElapsed {report['elapsed_s']}s | {report['requests']} requests | "
+          f"{report['throughput_rps']} req/s | error rate {report['error_rate']:.2%}")
+    print(f"{'kind':<8} {'reqs':>6} {'err':>5} {'rps':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for kind, s in report["by_kind"].items():
+        print(f"{kind:<8} {s['requests']:>6} {s['errors']:>5} {s['throughput_rps']:>8} "
+              f"{s['p50_ms']:>9} {s['p90_ms']:>9} {s['p99_ms']:>9} {s['max_ms']:>9}")
+    lag = report["event_loop_lag"]
+    print(f"event-loop lag (ms): p50={lag['p50_ms']} p99={lag['p99_ms']} max={lag['max_ms']}")
+    up = report["upstream"]
+    print(f"upstream: embedding calls={up['embedding_calls']} items={up['embedding_items']} "
+          f"llm calls={up['llm_calls']}")
+
+
+def main_cli(argv=None):
+    p = argparse.ArgumentParser(description="Load-test /chat and /upload against stand-in upstreams.")
+    p.add_argument("--duration", type=float, default=30.0, help="Measurement time in seconds.")
+    p.add_argument("--concurrency", type=int, default=16, help="Concurrent client connections.")
+    p.add_argument("--rate", type=float, default=0.0,
+                   help="Open-loop arrival rate in req/s (Poisson). 0 runs closed-loop at full concurrency.")
+    p.add_argument("--summary-ratio", type=float, default=0.1, help="Share of summary-mode /chat requests.")
+    p.add_argument("--upload-ratio", type=float, default=0.05, help="Share of /upload requests.")
+    p.add_argument("--seed-docs", type=int, default=3, help="Documents uploaded before measuring.")
+    p.add_argument("--embed-latency-ms", type=float, default=80.0)
+    p.add_argument("--llm-latency-ms", type=float, default=800.0)
+    p.add_argument("--jitter-ms", type=float, default=20.0)
+    p.add_argument("--lag-interval-ms", type=float, default=10.0)
+    p.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout.")
+    p.add_argument("--workdir", default=None, help="Working directory for the store (default: temp dir).")
+    p.add_argument("--json", dest="json_out", default=None, help="Also write the report to this file.")
+    args = p.parse_args(argv)
+
+    json_out = os.path.abspath(args.json_out) if args.json_out else None
+    own_workdir = args.workdir is None
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="rag_loadtest_"))
+    os.makedirs(workdir, exist_ok=True)
+
+    # The app and the stand-in upstreams each get their own process so the
+    # client threads and stub CPU work don't show up as event-loop lag.
+    try:
+        stubs, stub_url, app, base_url = start_processes(args, workdir)
+        try:
+            return _run(args, stub_url, base_url, workdir, json_out)
+        finally:
+            app.terminate()
+            stubs.terminate()
+            app.join(10)
+            stubs.join(10)
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run(args, stub_url, base_url, workdir, json_out):
+    driver = LoadDriver(base_url, args)
+    for i in range(args.seed_docs):
+        driver.upload(f"seed_{i}.txt").raise_for_status()
+    requests.get(f"{base_url}/_loadtest/lag", params={"reset": "true"}, timeout=10)
+    before = stub_stats(stub_url)
+
+    print(f"Running {args.duration:.0f}s against {base_url} "
+          f"({'open-loop %.1f req/s' % args.rate if args.rate > 0 else 'closed-loop'}, "
+          f"concurrency={args.concurrency}) in {workdir}")
+    t0 = time.perf_counter()
+    deadline = t0 + args.duration
+    if args.rate > 0:
+        driver.run_open(deadline)
+    else:
+        driver.run_closed(deadline)
+    elapsed = time.perf_counter() - t0
+
+    try:
+        cache_stats = requests.get(f"{base_url}/cache/stats", timeout=10).json()
+    except Exception:
+        cache_stats = None
+
+    lag = requests.get(f"{base_url}/_loadtest/lag", timeout=10).json()
+    after = stub_stats(stub_url)
+    upstream = {
+        "embedding_calls": after["calls"].get("embeddings", 0) - before["calls"].get("embeddings", 0),
+        "embedding_items": after["items"].get("embeddings", 0) - before["items"].get("embeddings", 0),
+        "llm_calls": after["calls"].get("llm", 0) - before["calls"].get("llm", 0),
+    }
+
+    report = build_report(driver, upstream, lag, elapsed, cache_stats)
+    print_report(report)
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,7 +1,8 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Request
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-import os, shutil, unicodedata, re, logging
+from starlette.concurrency import run_in_threadpool
+import os, shutil, logging
 from retriever import Retriever
 from llm_interface import LLMInterface
 from indexer import index_single_file
@@ -31,13 +32,6 @@ MIN_Q = 2
 MAX_Q = 2000
 
 
-def normalize(s: str):
-    if not s:
-        return ""
-    s = unicodedata.normalize("NFKC", s)
-    return re.sub(r"\s+", " ", s.lower()).strip()
-
-
 def is_summary_query(text: str) -> bool:
     normalized = text.lower().strip()
     return any(kw in normalized for kw in SUMMARY_KEYWORDS)
@@ -52,12 +46,14 @@ async def chat(q: Query, request: Request):
         return {"response": "Please ask a specific question about the uploaded documents."}
 
     show_page = not is_summary_query(txt)
-    context, src = retriever.retrieve(txt, show_page=show_page)
+    # Blocking embed/LLM calls run in the threadpool so concurrent chats can
+    # overlap (and be coalesced) instead of serialising on the event loop.
+    context, src = await run_in_threadpool(retriever.retrieve, txt, show_page=show_page)
 
     if context == "NO_RELEVANT":
         return {"response": "I can only answer questions about the uploaded documents."}
 
-    ans = llm.generate_response(txt, context)
+    ans = await run_in_threadpool(llm.generate_response, txt, context)
     last_answer = ans
     return {"response": ans}
 
@@ -105,3 +101,8 @@ async def reset(delete_pdfs: bool = False):
 
     retriever.store.load(CHROMA_STORE)
     return {"message": "Knowledge base reset."}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return retriever.cache_stats()
@@ -1,27 +1,96 @@
 import os
+import json
+import hashlib
 import logging
 from io import StringIO
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pdfminer.high_level import extract_pages
 from pdfminer.layout import LAParams, LTTextContainer
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# "layout" runs full LAParams analysis, including the hierarchical grouping
+# of text boxes (boxes_flow) that decides reading order. "fast" still groups
+# characters into words, lines and boxes but skips that grouping step,
+# typically the costliest part of the analysis on pages with many boxes.
+# Line breaks and word spacing are kept; the trade-off is reading order:
+# boxes are simply sorted by position (vertical boxes first, then horizontal
+# boxes top-to-bottom by their bottom edge, then left-to-right), so on
+# multi-column pages or pages with sidebars, boxes from different columns
+# interleave by height instead of each column being read through.
+EXTRACT_MODES = ("layout", "fast")
+PDF_EXTRACT_MODE = os.getenv("PDF_EXTRACT_MODE", "layout")
+PAGE_CACHE_DIR = os.getenv("PDF_PAGE_CACHE_DIR", "data/page_cache")
+_CACHE_VERSION = 2
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _laparams(mode: str) -> LAParams:
+    if mode == "fast":
+        return LAParams(boxes_flow=None)
+    return LAParams()
+
+
+def _cache_path(pdf_path: str, mode: str, cache_dir: str) -> str:
+    params = {"v": _CACHE_VERSION, "mode": mode, "laparams": vars(_laparams(mode))}
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{_file_hash(pdf_path)}-{digest}.json")
+
+
+def _extract_pages(pdf_path: str, laparams: LAParams, pages_text: List[str]):
+    for page_layout in extract_pages(pdf_path, laparams=laparams):
+        buf = StringIO()
+        for element in page_layout:
+            if isinstance(element, LTTextContainer):
+                buf.write(element.get_text())
+        pages_text.append(buf.getvalue())
+
+
+def _extract_text_by_page(pdf_path: str, mode: Optional[str] = None,
+                          cache_dir: Optional[str] = PAGE_CACHE_DIR) -> List[str]:
+    mode = mode or PDF_EXTRACT_MODE
+    if mode not in EXTRACT_MODES:
+        raise ValueError(f"Unknown PDF extraction mode: {mode}")
+
+    cache_file = None
+    if cache_dir:
+        try:
+            cache_file = _cache_path(pdf_path, mode, cache_dir)
+            with open(cache_file, "r", encoding="utf-8") as f:
+                pages_text = json.load(f)
+            logger.info(f"[pdf_processor] {os.path.basename(pdf_path)}: pages={len(pages_text)} (cached)")
+            return pages_text
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"[pdf_processor] Ignoring page cache for {pdf_path}: {e}")
 
-def _extract_text_by_page(pdf_path: str) -> List[str]:
     pages_text: List[str] = []
-    logger.info(f"[pdf_processor] Extracting pages: {pdf_path}")
+    logger.info(f"[pdf_processor] Extracting pages ({mode}): {pdf_path}")
     try:
-        for page_layout in extract_pages(pdf_path, laparams=LAParams()):
-            buf = StringIO()
-            for element in page_layout:
-                if isinstance(element, LTTextContainer):
-                    buf.write(element.get_text())
-            pages_text.append(buf.getvalue())
+        _extract_pages(pdf_path, _laparams(mode), pages_text)
         logger.info(f"[pdf_processor] {os.path.basename(pdf_path)}: pages={len(pages_text)}")
     except Exception as e:
         logger.error(f"[pdf_processor] Error extracting pages from {pdf_path}: {e}")
+        return pages_text
+
+    if cache_file:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(pages_text, f)
+            os.replace(tmp, cache_file)
+        except Exception as e:
+            logger.warning(f"[pdf_processor] Could not write page cache for {pdf_path}: {e}")
     return pages_text
 
 
@@ -42,13 +111,14 @@ def chunk_text(text: str, chunk_size=3000, overlap=1000) -> List[str]:
     return chunks
 
 
-def process_single_pdf(file_path: str) -> List[Dict]:
+def process_single_pdf(file_path: str, chunk_size: int = 900, overlap: int = 120,
+                       mode: Optional[str] = None) -> List[Dict]:
     filename = os.path.basename(file_path)
-    pages = _extract_text_by_page(file_path)
+    pages = _extract_text_by_page(file_path, mode=mode)
     out: List[Dict] = []
     total = 0
     for page_idx, page_text in enumerate(pages, start=1):
-        page_chunks = chunk_text(page_text, chunk_size=900, overlap=120)
+        page_chunks = chunk_text(page_text, chunk_size=chunk_size, overlap=overlap)
         total += len(page_chunks)
         for i, chunk in enumerate(page_chunks):
             out.append({
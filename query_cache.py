@@ -0,0 +1,89 @@
+import re
+import sys
+import time
+import hashlib
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+
+def normalize(s: str):
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKC", s)
+    return re.sub(r"\s+", " ", s.lower()).strip()
+
+
+def embedding_key(emb) -> bytes:
+    """Compact, hashable digest of an embedding vector."""
+    return hashlib.blake2b(array("d", emb).tobytes(), digest_size=16).digest()
+
+
+def approx_size(obj) -> int:
+    """Rough deep size in bytes of lists/dicts/strings/numbers."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(approx_size(v) for v in obj)
+    return size
+
+
+class LRUCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/memory accounting."""
+
+    def __init__(self, max_items: int = 1024, ttl: float = 3600.0):
+        self.max_items = max(1, max_items)
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires, size = entry
+            if self.ttl and expires < time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = approx_size(key) + approx_size(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (value, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while len(self._data) > self.max_items:
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "items": len(self._data),
+                "max_items": self.max_items,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "approx_bytes": self._bytes,
+            }
@@ -1,6 +1,9 @@
+import os
 import logging
 from typing import List, Tuple
 
+from coalesce import SingleFlight, MicroBatcher
+from query_cache import LRUCache, normalize, embedding_key
 from embedding_generator import EmbeddingGenerator
 from vector_store import VectorStore
 
@@ -17,6 +20,29 @@ class Retriever:
         self.store = VectorStore(dimension)
         self.eg = EmbeddingGenerator()
 
+        # Identical in-flight queries share one call; distinct ones arriving
+        # within the window go upstream as a single batched request. Query
+        # batches bypass the adaptive batch sizing used for indexing, and a
+        # failed batch is retried per query so one bad query fails alone.
+        self._inflight = SingleFlight()
+        self._batcher = MicroBatcher(
+            self.eg.generate_embeddings_once,
+            window=float(os.getenv("EMBEDDING_COALESCE_MS", "5")) / 1000.0,
+            max_batch=self.eg.max_batch,
+            single_fn=self.eg.generate_embedding,
+        )
+
+        # normalized query -> embedding, and (embedding, k, index version) -> hits.
+        self._emb_cache = LRUCache(
+            max_items=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+        )
+        self._result_cache = LRUCache(
+            max_items=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("RESULT_CACHE_TTL", "600")),
+        )
+        self._result_version = None
+
         try:
             self.store.load(self.db_path)
             logger.info("[Retriever] Loaded Chroma store with %d vectors.", len(self.store.texts))
@@ -24,7 +50,39 @@ class Retriever:
             logger.warning("[Retriever] No Chroma store found, starting empty.")
 
     def _embed(self, query: str) -> List[float]:
-        return self.eg.generate_embedding(query)
+        key = normalize(query)
+        emb = self._emb_cache.get(key)
+        if emb is None:
+            text = query.strip()
+            emb = self._inflight.do(key, lambda: self._batcher.submit(text))
+            self._emb_cache.put(key, emb)
+        return emb
+
+    def _search(self, q_emb: List[float], k: int) -> List[dict]:
+        # The local version covers add_vectors/load in this process; the row
+        # count catches writes from other processes (e.g. the bulk ingest CLI).
+        # A reset and re-ingest elsewhere that lands on the same count is not
+        # detected until RESULT_CACHE_TTL expires.
+        version = (self.store.version, self.store.count())
+        if version != self._result_version:
+            # Index changed: every cached hit list is stale.
+            self._result_cache.clear()
+            self._result_version = version
+
+        key = (embedding_key(q_emb), k, version)
+        results = self._result_cache.get(key)
+        if results is None:
+            results = self.store.search(q_emb, k=k)
+            self._result_cache.put(key, results)
+        return results
+
+    def cache_stats(self) -> dict:
+        return {
+            "index_version": self.store.version,
+            "embeddings": self._emb_cache.stats(),
+            "results": self._result_cache.stats(),
+            "coalesce": {**self._inflight.stats(), **self._batcher.stats()},
+        }
 
     def _format_source(self, meta: dict, show_page: bool = True) -> str:
         filename = meta.get("source") or "unknown"
@@ -93,7 +151,7 @@ class Retriever:
             return self._get_all_chunks()
 
         q_emb = self._embed(query)
-        results = self.store.search(q_emb, k=k)
+        results = self._search(q_emb, k)
 
         if not results:
             return "NO_RELEVANT", []
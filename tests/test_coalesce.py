@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coalesce import SingleFlight, MicroBatcher
+
+
+def _run_threads(target, args_list):
+    threads = [threading.Thread(target=target, args=args) for args in args_list]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_single_flight_shares_one_call_between_identical_keys():
+    sf = SingleFlight()
+    calls = []
+    release = threading.Event()
+    results = []
+
+    def work():
+        calls.append(1)
+        release.wait(1)
+        return "value"
+
+    def caller():
+        results.append(sf.do("key", work))
+
+    threads = [threading.Thread(target=caller) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["value"] * 8
+    assert sf.stats() == {"calls": 1, "shared": 7}
+    # Once the call has finished, the key starts a fresh call.
+    assert sf.do("key", lambda: "again") == "again"
+
+
+def test_micro_batcher_groups_items_within_window():
+    batches = []
+
+    def fn(items):
+        batches.append(list(items))
+        return [i * 2 for i in items]
+
+    batcher = MicroBatcher(fn, window=0.1, max_batch=16)
+    out = {}
+    _run_threads(lambda i: out.__setitem__(i, batcher.submit(i)), [(i,) for i in range(5)])
+
+    assert out == {i: i * 2 for i in range(5)}
+    assert len(batches) == 1 and sorted(batches[0]) == list(range(5))
+
+    # After the window has closed, a new submission opens a new batch.
+    assert batcher.submit(7) == 14
+    assert batches[-1] == [7]
+    assert batcher.stats() == {"batches": 2, "items": 6}
+
+
+def test_micro_batcher_closes_window_when_full():
+    batches = []
+
+    def fn(items):
+        batches.append(list(items))
+        return items
+
+    batcher = MicroBatcher(fn, window=5.0, max_batch=3)
+    start = time.monotonic()
+    _run_threads(batcher.submit, [(i,) for i in range(3)])
+
+    assert time.monotonic() - start < 2.0
+    assert [sorted(b) for b in batches] == [[0, 1, 2]]
+
+
+def test_micro_batcher_isolates_failing_item():
+    batch_calls = []
+    single_calls = []
+
+    def fn(items):
+        batch_calls.append(list(items))
+        if "bad" in items:
+            raise ValueError("rejected")
+        return [s.upper() for s in items]
+
+    def single(item):
+        single_calls.append(item)
+        if item == "bad":
+            raise ValueError("rejected")
+        return item.upper()
+
+    batcher = MicroBatcher(fn, window=0.1, max_batch=16, single_fn=single)
+    out = {}
+
+    def caller(item):
+        try:
+            out[item] = batcher.submit(item)
+        except ValueError as e:
+            out[item] = e
+
+    _run_threads(caller, [("a",), ("bad",), ("c",)])
+
+    assert len(batch_calls) == 1
+    assert sorted(single_calls) == ["a", "bad", "c"]
+    assert out["a"] == "A" and out["c"] == "C"
+    assert isinstance(out["bad"], ValueError)
@@ -0,0 +1,85 @@
+import os
+import sys
+import types
+import importlib.util
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_DIR)
+
+
+class FakeEmbeddingGenerator:
+    max_batch = 17
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_embeddings_once(self, texts):
+        self.calls += 1
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def generate_embedding(self, text):
+        return self.generate_embeddings_once([text])[0]
+
+
+class FakeVectorStore:
+    def __init__(self, dimension, collection_name="vector_store"):
+        self.texts = ["Leave is 25 days per year."]
+        self.meta = [{"source": "policy.pdf", "page": 3}]
+        self.version = 0
+        self.searches = 0
+
+    def load(self, folder):
+        self.version += 1
+
+    def count(self):
+        return len(self.texts)
+
+    def search(self, query_emb, k=5):
+        self.searches += 1
+        return [{"text": self.texts[0], "meta": self.meta[0], "score": 0.1}]
+
+
+def _load_retriever_module(monkeypatch):
+    # The module file is re.py, which would shadow the stdlib if imported by name.
+    monkeypatch.setitem(sys.modules, "embedding_generator",
+                        types.SimpleNamespace(EmbeddingGenerator=FakeEmbeddingGenerator))
+    monkeypatch.setitem(sys.modules, "vector_store", types.SimpleNamespace(VectorStore=FakeVectorStore))
+    spec = importlib.util.spec_from_file_location("retriever", os.path.join(REPO_DIR, "re.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_retrieve_caches_results_until_index_version_changes(monkeypatch):
+    retriever = _load_retriever_module(monkeypatch).Retriever(db_path="unused")
+    store = retriever.store
+
+    first = retriever.retrieve("How much leave do I get?")
+    second = retriever.retrieve("  how much LEAVE do I get? ")
+
+    assert first == second
+    assert first[1] == ["[SOURCE: policy.pdf p.3]"]
+    assert store.searches == 1
+    assert retriever.eg.calls == 1
+    stats = retriever.cache_stats()
+    assert stats["embeddings"]["hits"] == 1
+    assert stats["results"]["hits"] == 1
+
+    store.version += 1
+    retriever.retrieve("How much leave do I get?")
+
+    assert store.searches == 2
+    assert retriever.eg.calls == 1
+    assert retriever.cache_stats()["results"]["hits"] == 1
+
+
+def test_retrieve_invalidates_results_when_row_count_changes(monkeypatch):
+    retriever = _load_retriever_module(monkeypatch).Retriever(db_path="unused")
+    store = retriever.store
+
+    retriever.retrieve("How much leave do I get?")
+    # Another process (e.g. the bulk ingest CLI) added rows to the same DB.
+    store.texts.append("Carry-over is capped at 5 days.")
+    retriever.retrieve("How much leave do I get?")
+
+    assert store.searches == 2
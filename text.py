@@ -18,11 +18,11 @@ def chunk_text(text: str, chunk_size=900, overlap=120):
     return chunks
 
 
-def process_text_file(file_path: str):
+def process_text_file(file_path: str, chunk_size=900, overlap=120):
     filename = os.path.basename(file_path)
     with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
         text = f.read()
-    page_chunks = chunk_text(text, chunk_size=900, overlap=120)
+    page_chunks = chunk_text(text, chunk_size=chunk_size, overlap=overlap)
     out = []
     for i, chunk in enumerate(page_chunks):
         out.append({